@@ -1,6 +1,9 @@
-import time
+import heapq
 import random
-from queue import Queue, Empty
+from collections import deque
+
+# Simulated seconds represented by one pass of the protocol loop
+TICK = 0.005
 
 class SelectiveRepeatARQ:
     """
@@ -8,34 +11,76 @@ class SelectiveRepeatARQ:
     Based on networking course project - version 2.3
     """
     
-    def __init__(self, window_size, packet_loss_rate, total_packets=30):
+    # Fixed attribute layout: no per-instance __dict__, faster attribute access
+    __slots__ = (
+        'N', 'p_loss', 'total_packets', '_rng', '_random', '_lossless',
+        '_jitter_random',
+        # Sender side
+        'base_seq', 'next_seq_num', 'packet_timers', 'timer_heap', 'ack_mask',
+        'transmission_count', 'last_ack_time', 'packet_retries',
+        # Receiver side
+        'expected_seq', 'recv_mask',
+        # Channels and run state
+        'data_channel', 'ack_channel', 'now', 'simulation_start', 'finished',
+        'verbose',
+        # Tuning
+        'BASE_TIMEOUT', 'STALL_LIMIT', 'MAX_BACKOFF', '_timeout_table',
+        'JITTER', 'MAX_BATCH',
+    )
+    
+    def __init__(self, window_size, packet_loss_rate, total_packets=30,
+                 base_timeout=0.8, stall_limit=3.5, verbose=False, seed=None):
         self.N = window_size  # window size
         self.p_loss = packet_loss_rate
         self.total_packets = total_packets
         
+        # Private generator for loss draws so runs are reproducible on their own
+        self._rng = random.Random(seed)
+        self._random = self._rng.random
+        self._lossless = (packet_loss_rate == 0.0)  # no RNG draws needed at all
+        # Timeout jitter gets its own stream so tuning it never changes
+        # which packets are lost
+        jitter_seed = None if seed is None else f"{seed}:jitter"
+        self._jitter_random = random.Random(jitter_seed).random
+        
         # Sender side variables
         self.base_seq = 0
         self.next_seq_num = 0
-        self.packet_timers = {}
-        self.ack_received = set()
+        self.packet_timers = {}  # seq -> deadline of its live timer
+        self.timer_heap = []  # (deadline, seq) min-heap, may hold stale entries
+        self.ack_mask = 0  # bit i is set once packet i has been ACKed
         self.transmission_count = 0
         self.last_ack_time = 0
         self.packet_retries = {}  # count retransmissions per packet
         
         # Receiver side  
         self.expected_seq = 0
-        self.receiver_window = {}
+        self.recv_mask = 0  # bit i is set once packet i has been received
         
-        # Communication queues (simulate network channels)
-        self.data_channel = Queue()
-        self.ack_channel = Queue()
+        # Communication queues (simulate network channels), carrying bare
+        # sequence numbers -- each channel only ever holds one packet type
+        self.data_channel = deque()
+        self.ack_channel = deque()
         
+        # Logical clock, counted in ticks of TICK seconds
+        self.now = 0
         self.simulation_start = 0
         self.finished = False
+        self.verbose = verbose  # log per-packet protocol events
         
-        # Some tuning parameters we found through testing
-        self.BASE_TIMEOUT = 0.8
-        self.STALL_LIMIT = 3.5
+        # Tuning parameters, given in seconds and kept in ticks
+        self.BASE_TIMEOUT = base_timeout / TICK
+        self.STALL_LIMIT = stall_limit / TICK
+        
+        # Backoff grows 1.4x per retry and is capped at 5 retries, so
+        # there are only six possible timeouts -- compute them up front
+        self.MAX_BACKOFF = 5
+        self._timeout_table = tuple(self.BASE_TIMEOUT * (1.4 ** i)
+                                    for i in range(self.MAX_BACKOFF + 1))
+        # +/-20% random spread so packets that timed out together don't
+        # keep retransmitting in lockstep; the mean timeout is unchanged
+        self.JITTER = 0.2
+        self.MAX_BATCH = 64  # max packets drained from a channel per pass
     
     def transmit_packet(self, seq_num):
         """Send packet with sequence number, simulate potential loss"""
@@ -46,74 +91,97 @@ class SelectiveRepeatARQ:
             self.packet_retries[seq_num] = 0
         self.packet_retries[seq_num] += 1
         
+        # The sender can't tell whether the packet got through, so the
+        # retransmission timer runs either way
+        self._start_timer(seq_num, self.now)
+        
         # Simulate packet loss based on probability
-        if random.random() > self.p_loss:
-            pkt = {
-                'sequence': seq_num, 
-                'is_ack': False, 
-                'send_time': time.time()
-            }
-            self.data_channel.put(pkt)
-            self.packet_timers[seq_num] = time.time()
+        if self._lossless or self._random() > self.p_loss:
+            self.data_channel.append(seq_num)
             return True
         return False
     
+    def _start_timer(self, seq_num, start_time):
+        """Arm retransmission timer for a packet sent at start_time"""
+        deadline = start_time + self.calculate_timeout(seq_num)
+        self.packet_timers[seq_num] = deadline
+        heapq.heappush(self.timer_heap, (deadline, seq_num))
+    
     def send_acknowledgment(self, seq_num):
         """Send ACK for received packet, also subject to loss"""
-        if random.random() > self.p_loss:
-            ack_pkt = {
-                'sequence': seq_num, 
-                'is_ack': True, 
-                'send_time': time.time()
-            }
-            self.ack_channel.put(ack_pkt)
+        if self._lossless or self._random() > self.p_loss:
+            self.ack_channel.append(seq_num)
             return True
         return False
     
     def calculate_timeout(self, seq_num):
-        """Dynamic timeout based on retransmission count"""
+        """Dynamic timeout based on retransmission count, with random jitter"""
         retry_count = self.packet_retries.get(seq_num, 0)
         # Increase timeout with retries, but not too much
-        return self.BASE_TIMEOUT * (1.4 ** min(retry_count, 5))
+        timeout = self._timeout_table[min(retry_count, self.MAX_BACKOFF)]
+        if self._lossless:
+            return timeout  # nothing is lost, so timers never fire
+        return timeout * (1 - self.JITTER + 2 * self.JITTER * self._jitter_random())
     
     def execute_protocol(self):
         """Main protocol execution loop"""
-        self.simulation_start = time.time()
+        self.simulation_start = self.now
         self.last_ack_time = self.simulation_start
-        max_simulation_time = 25  # don't run forever
+        max_ticks = 5000  # 25s of simulated time, don't run forever
+        
+        if self.verbose:
+            print(f"Starting SRP test: window={self.N}, loss_rate={self.p_loss}")
         
-        print(f"Starting SRP test: window={self.N}, loss_rate={self.p_loss}")
+        # Bind everything the loop touches that doesn't change between passes
+        transmit_new = self._transmit_new_packets
+        handle_data = self._handle_data_reception
+        process_acks = self._process_acknowledgments
+        check_timeouts = self._check_timeouts
+        total_packets = self.total_packets
+        stall_limit = self.STALL_LIMIT
+        timer_heap = self.timer_heap
+        end_tick = self.simulation_start + max_ticks
         
-        while self.base_seq < self.total_packets and time.time() - self.simulation_start < max_simulation_time:
-            current_time = time.time()
+        while self.base_seq < total_packets and self.now < end_tick:
+            current_time = self.now
             
             # Check if we're stuck - no progress for a while
-            if current_time - self.last_ack_time > self.STALL_LIMIT:
-                print(f"Detected stall at sequence {self.base_seq}, triggering recovery")
+            if current_time - self.last_ack_time > stall_limit:
+                if self.verbose:
+                    print(f"Detected stall at sequence {self.base_seq}, triggering recovery")
                 self._recover_from_stall()
                 self.last_ack_time = current_time
             
             # Try to send new packets in window
-            sent_count = self._transmit_new_packets()
+            sent_count = transmit_new()
             if sent_count > 0:
                 self.last_ack_time = current_time
             
             # Process any received data packets
-            self._handle_data_reception()
+            got_data = handle_data()
             
             # Process any received ACKs
-            self._process_acknowledgments()
+            got_acks = process_acks()
             
             # Check for timed out packets
-            self._check_timeouts()
+            resent = check_timeouts()
             
-            time.sleep(0.005)  # small delay to prevent CPU spinning
+            if sent_count or got_data or got_acks or resent:
+                self.now = current_time + 1  # advance the simulated clock by one tick
+            else:
+                # Idle pass: nothing changes until a timer expires or the
+                # stall check trips, so jump the clock straight there
+                next_event = self.last_ack_time + stall_limit
+                if timer_heap:
+                    next_event = min(next_event, timer_heap[0][0])
+                self.now = min(max(current_time + 1, int(next_event) + 1), end_tick)
         
         self.finished = (self.base_seq >= self.total_packets)
-        elapsed = time.time() - self.simulation_start
+        elapsed = (self.now - self.simulation_start) * TICK
         
-        print(f"Completed: final_seq={self.base_seq}, total_xmits={self.transmission_count}, "
-              f"time={elapsed:.2f}s")
+        if self.verbose:
+            print(f"Completed: final_seq={self.base_seq}, total_xmits={self.transmission_count}, "
+                  f"time={elapsed:.2f}s")
         
         return self.base_seq
     
@@ -122,97 +190,129 @@ class SelectiveRepeatARQ:
         sent = 0
         while (self.next_seq_num < self.base_seq + self.N and 
                self.next_seq_num < self.total_packets):
-            if self.next_seq_num not in self.ack_received:
+            if not self.ack_mask & (1 << self.next_seq_num):
                 if self.transmit_packet(self.next_seq_num):
                     sent += 1
             self.next_seq_num += 1
         return sent
     
     def _handle_data_reception(self):
-        """Process incoming data packets at receiver"""
-        try:
-            pkt = self.data_channel.get(timeout=0.01)
-            if pkt and not pkt['is_ack']:
-                seq = pkt['sequence']
-                
-                # Check if packet is within our receiving window
-                window_start = self.expected_seq
-                window_end = window_start + self.N - 1
-                
-                if window_start <= seq <= min(window_end, self.total_packets - 1):
-                    if seq not in self.receiver_window:
-                        self.receiver_window[seq] = True
-                        self.send_acknowledgment(seq)
-                    
-                    # Deliver any in-order packets we can
-                    while self.expected_seq in self.receiver_window:
-                        del self.receiver_window[self.expected_seq]
-                        self.expected_seq += 1
-                        
-                # If it's an old packet, still ACK it (might help sender)
-                elif seq < window_start:
+        """Drain incoming data packets at receiver, return how many were handled"""
+        handled = 0
+        
+        # Bounded so a flooded channel can't starve the timeout check
+        while handled < self.MAX_BATCH:
+            try:
+                seq = self.data_channel.popleft()
+            except IndexError:
+                break  # Channel is empty
+            handled += 1
+            
+            # Check if packet is within our receiving window
+            window_start = self.expected_seq
+            window_end = window_start + self.N - 1
+            
+            if window_start <= seq <= min(window_end, self.total_packets - 1):
+                if not self.recv_mask & (1 << seq):
+                    self.recv_mask |= 1 << seq
                     self.send_acknowledgment(seq)
+                
+                # Deliver any in-order packets we can: skip past the run
+                # of received bits starting at expected_seq
+                missing = ~self.recv_mask >> self.expected_seq
+                self.expected_seq += (missing & -missing).bit_length() - 1
                     
-        except Empty:
-            pass  # No packet received
+            # If it's an old packet, still ACK it (might help sender)
+            elif seq < window_start:
+                self.send_acknowledgment(seq)
+        
+        return handled
     
     def _process_acknowledgments(self):
-        """Process incoming ACKs at sender"""
-        try:
-            ack_pkt = self.ack_channel.get(timeout=0.01)
-            if ack_pkt and ack_pkt['is_ack']:
-                seq = ack_pkt['sequence']
-                
-                self.ack_received.add(seq)
-                if seq in self.packet_timers:
-                    del self.packet_timers[seq]
-                
-                # Reset retry counter for this packet
-                if seq in self.packet_retries:
-                    del self.packet_retries[seq]
-                
-                # Move window forward as much as possible
-                while self.base_seq in self.ack_received:
-                    self.base_seq += 1
-                    self.last_ack_time = time.time()
-                    
-        except Empty:
-            pass  # No ACK received
+        """Drain incoming ACKs at sender, return how many were handled"""
+        handled = 0
+        
+        while handled < self.MAX_BATCH:
+            try:
+                seq = self.ack_channel.popleft()
+            except IndexError:
+                break  # Channel is empty
+            handled += 1
+            
+            self.ack_mask |= 1 << seq
+            if seq in self.packet_timers:
+                del self.packet_timers[seq]
+            
+            # Reset retry counter for this packet
+            if seq in self.packet_retries:
+                del self.packet_retries[seq]
+            
+            # Move window forward as much as possible: the lowest set bit
+            # of ~ack_mask at or above base is the first unACKed packet
+            unacked = ~self.ack_mask >> self.base_seq
+            advance = (unacked & -unacked).bit_length() - 1
+            if advance:
+                self.base_seq += advance
+                self.last_ack_time = self.now
+        
+        return handled
     
     def _check_timeouts(self):
-        """Check for packets that need retransmission due to timeout"""
-        current_time = time.time()
-        expired_packets = []
-        
-        for seq, sent_time in list(self.packet_timers.items()):
-            timeout_val = self.calculate_timeout(seq)
-            if current_time - sent_time > timeout_val:
-                expired_packets.append(seq)
-        
-        for seq in expired_packets:
-            if seq not in self.ack_received and seq < self.total_packets:
-                print(f"Timeout for packet {seq}, retransmitting (timeout={timeout_val:.2f}s)")
-                self.transmit_packet(seq)
-                self.packet_timers[seq] = current_time
+        """Check for packets that need retransmission due to timeout, return how many were resent"""
+        current_time = self.now
+        timer_heap = self.timer_heap
+        resent = 0
+        
+        # Pop timers in deadline order until the earliest one hasn't expired yet
+        while timer_heap and timer_heap[0][0] < current_time:
+            deadline, seq = heapq.heappop(timer_heap)
+            
+            # Skip entries left behind by ACKed or re-armed packets
+            if self.packet_timers.get(seq) != deadline:
+                continue
+            
+            if not self.ack_mask & (1 << seq) and seq < self.total_packets:
+                self.transmit_packet(seq)  # re-arms the timer
+                
+                if self.verbose:
+                    timeout_val = self.packet_timers[seq] - current_time
+                    print(f"Timeout for packet {seq}, retransmitting (timeout={timeout_val * TICK:.2f}s)")
+                resent += 1
+        
+        return resent
     
     def _recover_from_stall(self):
         """Try to recover when protocol seems stuck"""
-        print(f"Stall recovery: resetting from sequence {self.base_seq}")
+        if self.verbose:
+            print(f"Stall recovery: resetting from sequence {self.base_seq}")
         
         # Go back to current base and retransmit unacked packets
         self.next_seq_num = self.base_seq
         
         for seq in range(self.base_seq, min(self.base_seq + self.N, self.total_packets)):
-            if seq not in self.ack_received:
+            if not self.ack_mask & (1 << seq):
                 self.transmit_packet(seq)
 
 
+def _run_scenario(args):
+    """Run one comparison scenario, return (description, delivered, transmissions, finished)"""
+    loss, window, description, base_timeout, stall_limit, seed = args
+    protocol = SelectiveRepeatARQ(window, loss, 30, base_timeout=base_timeout,
+                                  stall_limit=stall_limit, verbose=False, seed=seed)
+    delivered = protocol.execute_protocol()
+    return description, delivered, protocol.transmission_count, protocol.finished
+
+
 def run_protocol_comparison():
     """Run comparison tests for the protocol"""
     print("SELECTIVE REPEAT ARQ - PERFORMANCE TEST")
     print("=" * 55)
     
-    random.seed(42)  # For reproducible results
+    seed = 42  # For reproducible results
+    
+    # Timeout tuning we found through testing (seconds)
+    base_timeout = 0.8
+    stall_limit = 3.5
     
     test_scenarios = [
         (0.0, 4, "Ideal conditions"),
@@ -222,16 +322,18 @@ def run_protocol_comparison():
         (0.4, 4, "Very high loss"),
     ]
     
+    # Each scenario seeds its own RNG, so results don't depend on run order
+    jobs = [(loss, window, description, base_timeout, stall_limit, seed)
+            for loss, window, description in test_scenarios]
+    results = map(_run_scenario, jobs)
+    
     print("\nSELECTIVE REPEAT ARQ RESULTS:")
     print("Scenario      | Efficiency | Progress | Status")
     print("-" * 50)
     
-    for loss, window, description in test_scenarios:
-        protocol = SelectiveRepeatARQ(window, loss, 30)
-        delivered = protocol.execute_protocol()
-        
-        efficiency = protocol.transmission_count / delivered if delivered > 0 else 999
-        status = "COMPLETE" if protocol.finished else "TIMEOUT"
+    for description, delivered, transmission_count, finished in results:
+        efficiency = transmission_count / delivered if delivered > 0 else 999
+        status = "COMPLETE" if finished else "TIMEOUT"
         
         print(f"{description:13} | k={efficiency:5.2f}    | {delivered:2d}/30   | {status}")
     